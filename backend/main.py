@@ -2,7 +2,7 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import logging
 import boto3
@@ -10,17 +10,23 @@ from botocore.exceptions import ClientError
 import re
 from rag_utils import RAGManager
 import asyncio
+import functools
 from concurrent.futures import ThreadPoolExecutor
-import io
 import urllib.parse
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. force=True because importing rag_utils has already
+# configured the root logger at INFO before the .env file was loaded.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), force=True)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Corporate Card Support API")
@@ -30,14 +36,68 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "teamone-kb")
 LAMBDA_FUNCTION_NAME = os.getenv("LAMBDA_FUNCTION_NAME", "claude-api-function")
 LAMBDA_REGION = os.getenv("LAMBDA_REGION", "ca-central-1")
 RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+RAG_SEARCH_CACHE_SIZE = int(os.getenv("RAG_SEARCH_CACHE_SIZE", "256"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "20"))
 CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+DOCUMENT_CHUNK_SIZE = 64 * 1024
+CHAT_MAX_WORKERS = int(os.getenv("CHAT_MAX_WORKERS", "8"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "60"))
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", "512"))
+
+# Keyword groups used to pick follow-up suggestions. Built once at import
+# instead of as list literals on every /chat request.
+TRANSACTION_KEYWORDS = ('transaction', 'charge', 'purchase', 'payment')
+ACTIVATION_KEYWORDS = ('activate', 'new card', 'replacement')
+LIMIT_KEYWORDS = ('limit', 'credit', 'increase')
+REWARDS_KEYWORDS = ('rewards', 'points', 'redeem')
+REPORT_KEYWORDS = ('report', 'expense', 'statement')
+DISPUTE_KEYWORDS = ('dispute', 'fraud', 'unauthorized')
+FEE_KEYWORDS = ('fee', 'charge', 'interest')
+TRAVEL_KEYWORDS = ('travel', 'international', 'foreign')
+LOST_CARD_KEYWORDS = ('lost', 'stolen')
+
+# One compiled pattern with a named group per keyword group. Wrapping the
+# alternation in a lookahead lets finditer report a match at every position,
+# so a single pass over the message finds every group that appears in it.
+FOLLOW_UP_KEYWORD_GROUPS = (
+    ('transaction', TRANSACTION_KEYWORDS),
+    ('activation', ACTIVATION_KEYWORDS),
+    ('limit', LIMIT_KEYWORDS),
+    ('rewards', REWARDS_KEYWORDS),
+    ('report', REPORT_KEYWORDS),
+    ('dispute', DISPUTE_KEYWORDS),
+    ('fee', FEE_KEYWORDS),
+    ('travel', TRAVEL_KEYWORDS),
+)
+FOLLOW_UP_KEYWORD_RE = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{name}>{'|'.join(map(re.escape, words))})"
+        for name, words in FOLLOW_UP_KEYWORD_GROUPS
+    ) + ")"
+)
 
 # Initialize RAG Manager
-rag_manager = RAGManager(s3_bucket_name=S3_BUCKET_NAME)
+rag_manager = RAGManager(s3_bucket_name=S3_BUCKET_NAME, search_cache_size=RAG_SEARCH_CACHE_SIZE)
+
+# AWS clients are thread-safe once created, so build them once and share them
+# across requests instead of paying client construction on every call
+lambda_client = boto3.client("lambda", region_name=LAMBDA_REGION)
+s3_client = boto3.client("s3", region_name=os.getenv("AWS_DEFAULT_REGION", "ca-central-1"))
+
+# Short-lived cache of LLM responses keyed by a hash of the prompt, so repeated
+# identical prompts (e.g. the canned example prompts) skip the Lambda call
+llm_cache: "OrderedDict[bytes, tuple[float, str]]" = OrderedDict()
+llm_cache_lock = threading.Lock()
+llm_cache_stats = {"hits": 0, "misses": 0}
 
 # Thread pool for async operations
 executor = ThreadPoolExecutor(max_workers=4)
 
+# Separate, bounded pool for chat requests so a long indexing run can't
+# occupy the workers that serve RAG search and LLM calls
+chat_executor = ThreadPoolExecutor(max_workers=CHAT_MAX_WORKERS, thread_name_prefix="chat")
+
 # Configure CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -84,36 +144,50 @@ async def startup_event():
         async def index_in_background():
             loop = asyncio.get_event_loop()
             stats = await loop.run_in_executor(executor, rag_manager.index_all_documents)
-            logger.info(f"Background indexing completed with stats: {stats}")
+            logger.info("Background indexing completed with stats: %s", stats)
         
         asyncio.create_task(index_in_background())
         logger.info("Started background document indexing")
     except Exception as e:
-        logger.error(f"Error during startup indexing: {e}")
+        logger.error("Error during startup indexing: %s", e)
+
+@app.get("/llm/cache/stats")
+async def get_llm_cache_stats():
+    """Get hit/miss statistics for the LLM response cache"""
+    with llm_cache_lock:
+        return {
+            "size": len(llm_cache),
+            "max_size": LLM_CACHE_MAX_SIZE,
+            "ttl_seconds": LLM_CACHE_TTL,
+            **llm_cache_stats
+        }
 
 @app.get("/rag/stats")
 async def get_rag_stats():
     """Get statistics about the RAG index"""
     try:
-        stats = rag_manager.get_stats()
+        # get_stats reads every chunk's metadata from Chroma; keep it off the
+        # event loop so large indexes don't stall other requests
+        loop = asyncio.get_event_loop()
+        stats = await loop.run_in_executor(executor, rag_manager.get_stats)
         return stats
     except Exception as e:
-        logger.error(f"Error getting RAG stats: {e}")
+        logger.error("Error getting RAG stats: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/rag/index", response_model=IndexResponse)
 async def index_documents(request: IndexRequest):
     """Manually trigger document indexing"""
     try:
+        loop = asyncio.get_event_loop()
         if request.reindex:
             # Clear existing index first
-            rag_manager.clear_index()
+            await loop.run_in_executor(executor, rag_manager.clear_index)
             message = "Cleared existing index. "
         else:
             message = ""
         
         # Run indexing in executor to avoid blocking
-        loop = asyncio.get_event_loop()
         stats = await loop.run_in_executor(executor, rag_manager.index_all_documents)
         
         return IndexResponse(
@@ -122,9 +196,17 @@ async def index_documents(request: IndexRequest):
             stats=stats
         )
     except Exception as e:
-        logger.error(f"Error indexing documents: {e}")
+        logger.error("Error indexing documents: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _iter_s3_body(body):
+    """Yield an S3 body in chunks, releasing the pooled connection even if
+    the client disconnects before the download finishes"""
+    try:
+        yield from body.iter_chunks(chunk_size=DOCUMENT_CHUNK_SIZE)
+    finally:
+        body.close()
+
 @app.get("/documents/{document_name}")
 async def get_document(document_name: str):
     """Serve documents from S3 bucket"""
@@ -132,12 +214,12 @@ async def get_document(document_name: str):
         # URL decode the document name
         document_name = urllib.parse.unquote(document_name)
         
-        # Get the document from S3
-        s3_client = boto3.client("s3", region_name=os.getenv("AWS_DEFAULT_REGION", "ca-central-1"))
-        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=document_name)
-        
-        # Create a streaming response
-        file_content = response['Body'].read()
+        # Get the document from S3 without blocking the event loop. Use the
+        # default pool so a long indexing run in `executor` can't delay it.
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            None, functools.partial(s3_client.get_object, Bucket=S3_BUCKET_NAME, Key=document_name)
+        )
         
         # Determine content type based on file extension
         content_type = "application/pdf"
@@ -150,24 +232,57 @@ async def get_document(document_name: str):
         elif document_name.lower().endswith(('.ppt', '.pptx')):
             content_type = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
         
+        # Stream the S3 body through in chunks instead of buffering the whole
+        # document in memory before the first byte is sent
         return StreamingResponse(
-            io.BytesIO(file_content),
+            _iter_s3_body(response['Body']),
             media_type=content_type,
             headers={
                 "Content-Disposition": f"inline; filename={document_name}",
-                "Content-Type": content_type
+                "Content-Type": content_type,
+                "Content-Length": str(response['ContentLength'])
             }
         )
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
             raise HTTPException(status_code=404, detail="Document not found")
         else:
-            logger.error(f"Error retrieving document {document_name}: {e}")
+            logger.error("Error retrieving document %s: %s", document_name, e)
             raise HTTPException(status_code=500, detail="Error retrieving document")
     except Exception as e:
-        logger.error(f"Error serving document {document_name}: {e}")
+        logger.error("Error serving document %s: %s", document_name, e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _llm_cache_key(prompt: str, max_tokens: int) -> bytes:
+    """Build a compact cache key for a prompt"""
+    return hashlib.blake2b(f"{max_tokens}:{prompt}".encode(), digest_size=16).digest()
+
+def _get_cached_llm_response(key: bytes) -> Optional[str]:
+    """Return a cached LLM response if present and not expired"""
+    if LLM_CACHE_TTL <= 0:
+        return None
+    with llm_cache_lock:
+        entry = llm_cache.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del llm_cache[key]
+            entry = None
+        if entry is None:
+            llm_cache_stats["misses"] += 1
+            return None
+        llm_cache_stats["hits"] += 1
+        llm_cache.move_to_end(key)
+        return entry[1]
+
+def _store_llm_response(key: bytes, response_text: str):
+    """Cache an LLM response, evicting the least recently used entry when full"""
+    if LLM_CACHE_TTL <= 0:
+        return
+    with llm_cache_lock:
+        llm_cache[key] = (time.monotonic() + LLM_CACHE_TTL, response_text)
+        llm_cache.move_to_end(key)
+        while len(llm_cache) > LLM_CACHE_MAX_SIZE:
+            llm_cache.popitem(last=False)
+
 def invoke_lambda_claude(prompt: str, max_tokens: int = 1024):
     """
     Invoke AWS Lambda function that calls Claude API.
@@ -180,10 +295,14 @@ def invoke_lambda_claude(prompt: str, max_tokens: int = 1024):
     Returns:
         str: The response text from Claude, or dict with error if failed
     """
-    try:
-        # Create Lambda client
-        lambda_client = boto3.client("lambda", region_name=LAMBDA_REGION)
+    cache_key = _llm_cache_key(prompt, max_tokens)
+    cached_response = _get_cached_llm_response(cache_key)
+    if cached_response is not None:
+        logger.info("LLM response served from cache (hits: %d, misses: %d)",
+                    llm_cache_stats["hits"], llm_cache_stats["misses"])
+        return cached_response
 
+    try:
         # Prepare payload for Lambda function
         payload = {
             "prompt": prompt,
@@ -213,10 +332,12 @@ def invoke_lambda_claude(prompt: str, max_tokens: int = 1024):
 
         # Log usage information
         usage = body.get('usage', {})
-        logger.info(f"LLM Response received. Model: {body.get('model', 'unknown')}, "
-                   f"Input tokens: {usage.get('input_tokens', 0)}, "
-                   f"Output tokens: {usage.get('output_tokens', 0)}")
+        logger.info("LLM Response received. Model: %s, Input tokens: %s, Output tokens: %s",
+                    body.get('model', 'unknown'),
+                    usage.get('input_tokens', 0),
+                    usage.get('output_tokens', 0))
 
+        _store_llm_response(cache_key, response_text)
         return response_text
 
     except (ClientError, Exception) as e:
@@ -229,26 +350,32 @@ async def get_chat_response(request: Request):
     try:
         # Get the request body
         body = await request.json()
-        logger.info(f"Received request: {body}")
+        logger.debug("Received request: %s", body)
         
         # Validate the request
         if not isinstance(body.get('messages'), list):
             raise HTTPException(status_code=400, detail="Invalid request format: messages must be a list")
         
-        # Get the latest user message
+        # Get the latest user message once; downstream helpers reuse it
         messages = body['messages']
-        latest_message = next(msg for msg in messages[::-1] if msg['isUser'])
+        latest_message = next(msg for msg in reversed(messages) if msg['isUser'])
+        latest_user_message = latest_message['text']
         
         # Get the context from the request or initialize it
         context = body.get('context', {})
-        logger.info(f"Received context: {context}")
+        logger.info("Received context: %s", context)
         
-        # Process the message and generate response
-        response_text = process_message(messages, context)
-        logger.info(f"Final context after processing: {context}")
+        # Process the message and generate response. RAG search and the Lambda
+        # call are blocking, so run them off the event loop to keep concurrent
+        # requests from queueing behind each other
+        loop = asyncio.get_event_loop()
+        response_text = await loop.run_in_executor(
+            chat_executor, process_message, messages, context, latest_user_message
+        )
+        logger.info("Final context after processing: %s", context)
         
         # Generate follow-up options based on conversation context
-        follow_up_options = generate_follow_up_options(messages, context)
+        follow_up_options = generate_follow_up_options(latest_user_message, context)
 
         # If we have enough context, generate a card summary
         quote = None
@@ -264,38 +391,18 @@ async def get_chat_response(request: Request):
             context=context  # Include updated context in the response
         )
         
-        logger.info(f"Sending response: {response}")
+        logger.debug("Sending response: %s", response)
         return response
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}", exc_info=True)
+        logger.error("Error processing request: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-def process_message(messages: List[Dict], context: Dict) -> str:
-    """Process the incoming message and generate a response."""
-    try:
-        # Get the latest user message for RAG search
-        latest_user_message = ""
-        for msg in reversed(messages):
-            if msg['isUser']:
-                latest_user_message = msg['text']
-                break
-        
-        # Search for relevant documents using RAG
-        rag_context = ""
-        if latest_user_message:
-            rag_context = rag_manager.get_context_for_prompt(latest_user_message, k=RAG_TOP_K)
-        
-        # Format conversation history for the prompt
-        conversation_history = ""
-        for idx, msg in enumerate(messages):
-            role = "User" if msg['isUser'] else "Assistant"
-            conversation_history += f"{role}: {msg['text']}\n"
-        
-        # Create a prompt for the LLM based on the message and context
-        prompt = f"""
+# Prompt sent to the LLM for every chat turn. Kept at module level so the large
+# static body is built once; process_message only fills in the dynamic fields.
+CHAT_PROMPT_TEMPLATE = """
 You are a BMO Corporate Card AI assistant. Your task is to provide fast, personalized, and context-aware support to corporate card holders through a conversational interface. You handle policy queries, account data, transactions, analytics, and escalations to reduce support costs and enhance user satisfaction.
 
-Current conversation context: {json.dumps(context)}
+Current conversation context: {context}
 
 {rag_context}
 
@@ -388,14 +495,38 @@ Say: "Credit limit increases require approval from your account administrator...
 
 Your response should be conversational, solution-focused, and empowering. Provide specific, actionable information that helps cardholders resolve their issues quickly. Start your response directly with the relevant information without any meta-commentary.
 """
+
+def process_message(messages: List[Dict], context: Dict, latest_user_message: str) -> str:
+    """Process the incoming message and generate a response."""
+    try:
+        # Search for relevant documents using RAG
+        rag_context = ""
+        if latest_user_message:
+            rag_context = rag_manager.get_context_for_prompt(latest_user_message, k=RAG_TOP_K)
+        
+        # Format conversation history for the prompt, keeping only the most
+        # recent messages so long chats don't grow the prompt without bound
+        if CHAT_HISTORY_MAX_MESSAGES > 0:
+            messages = messages[-CHAT_HISTORY_MAX_MESSAGES:]
+        conversation_history = "".join(
+            f"{'User' if msg['isUser'] else 'Assistant'}: {msg['text']}\n"
+            for msg in messages
+        )
+        
+        # Create a prompt for the LLM based on the message and context
+        prompt = CHAT_PROMPT_TEMPLATE.format(
+            context=json.dumps(context, separators=(',', ':')),
+            rag_context=rag_context,
+            conversation_history=conversation_history
+        )
         
         # Get response from Claude via Lambda
-        response = invoke_lambda_claude(prompt, max_tokens=1024)
-        print(f"Raw LLM response: {response}")
+        response = invoke_lambda_claude(prompt, max_tokens=LLM_MAX_TOKENS)
+        logger.debug("Raw LLM response: %s", response)
         
         # Check if there was an error
         if isinstance(response, dict) and "error" in response:
-            logger.error(f"Error from LLM: {response['error']}")
+            logger.error("Error from LLM: %s", response['error'])
             return "Sorry, I'm having trouble processing your request right now. Please try again in a moment."
         
         # Extract context JSON if it exists
@@ -415,84 +546,154 @@ Your response should be conversational, solution-focused, and empowering. Provid
                 
                 # Update the context with the new information
                 context.update(context_update)
-                logger.info(f"Updated context: {context}")
+                logger.info("Updated context: %s", context)
             except json.JSONDecodeError as e:
-                logger.error(f"Error parsing context JSON: {e}")
+                logger.error("Error parsing context JSON: %s", e)
         
         return user_response
         
     except Exception as e:
-        logger.error(f"Error in process_message: {str(e)}")
+        logger.error("Error in process_message: %s", e)
         return "Sorry, there was an error processing your request. Please try again."
 
-def generate_follow_up_options(messages: List[Dict], context: Dict) -> List[str]:
-    """Generate relevant follow-up options based on the conversation."""
+# Follow-up suggestions returned by generate_follow_up_options. These never
+# change, so they are shared immutable tuples rather than lists built per call.
+TRANSACTIONS_START_FOLLOW_UPS = ("View recent transactions", "Search for specific transaction", "Download transaction history")
+TRANSACTIONS_DISPUTE_FOLLOW_UPS = ("File a dispute", "Check dispute status", "Upload supporting documents")
+TRANSACTIONS_DETAIL_FOLLOW_UPS = ("Export to Excel", "Set up transaction alerts", "Ask another question")
+REWARDS_START_FOLLOW_UPS = ("Check rewards balance", "View redemption options", "See earning rates")
+REWARDS_REDEEM_FOLLOW_UPS = ("Redeem for travel", "Redeem for cash back", "Transfer to partners")
+ANALYTICS_FOLLOW_UPS = ("View spending by category", "Generate expense report", "Download year-to-date summary", "Track budget vs. actual")
+ACCOUNT_ACTIVATE_FOLLOW_UPS = ("Activate by phone", "Activate through mobile app", "Activate online")
+ACCOUNT_LIMIT_FOLLOW_UPS = ("Check current limit", "Request limit increase", "Set spending alerts")
+ACCOUNT_LOST_CARD_FOLLOW_UPS = ("Block card immediately", "Order replacement card", "Review recent transactions")
+ACCOUNT_GENERAL_FOLLOW_UPS = ("Update account info", "Add authorized users", "Manage card settings")
+TECHNICAL_LOGIN_FOLLOW_UPS = ("Reset password", "Unlock account", "Set up two-factor authentication")
+TECHNICAL_APP_FOLLOW_UPS = ("Update mobile app", "Clear app cache", "Reinstall app")
+TECHNICAL_GENERAL_FOLLOW_UPS = ("Contact technical support", "View system status", "Access user guide")
+TRANSACTION_KEYWORD_FOLLOW_UPS = ("View my transactions", "Dispute a charge", "Download statement")
+ACTIVATION_KEYWORD_FOLLOW_UPS = ("Activate my card", "Check card status", "Order replacement")
+LIMIT_KEYWORD_FOLLOW_UPS = ("Check my credit limit", "Request limit increase", "View available credit")
+REWARDS_KEYWORD_FOLLOW_UPS = ("Check rewards balance", "Redeem rewards", "Learn about rewards program")
+REPORT_KEYWORD_FOLLOW_UPS = ("Generate expense report", "Download statement", "View spending summary")
+DISPUTE_KEYWORD_FOLLOW_UPS = ("Report fraudulent transaction", "File a dispute", "Block my card")
+FEE_KEYWORD_FOLLOW_UPS = ("View fee schedule", "Understand my charges", "Ask about interest rates")
+TRAVEL_KEYWORD_FOLLOW_UPS = ("Set travel notification", "Check foreign transaction fees", "View travel benefits")
+DEFAULT_FOLLOW_UPS = ("View account summary", "Check recent transactions", "Ask another question")
+
+# Follow-ups for each keyword group, in priority order: when a message matches
+# several groups, the first one listed wins
+KEYWORD_FOLLOW_UPS = MappingProxyType({
+    'transaction': TRANSACTION_KEYWORD_FOLLOW_UPS,
+    'activation': ACTIVATION_KEYWORD_FOLLOW_UPS,
+    'limit': LIMIT_KEYWORD_FOLLOW_UPS,
+    'rewards': REWARDS_KEYWORD_FOLLOW_UPS,
+    'report': REPORT_KEYWORD_FOLLOW_UPS,
+    'dispute': DISPUTE_KEYWORD_FOLLOW_UPS,
+    'fee': FEE_KEYWORD_FOLLOW_UPS,
+    'travel': TRAVEL_KEYWORD_FOLLOW_UPS,
+})
+
+def generate_follow_up_options(latest_user_message: str, context: Dict) -> Tuple[str, ...]:
+    """Generate relevant follow-up options based on the latest user message."""
     try:
-        # Get the latest user message
-        latest_message = next(msg for msg in messages[::-1] if msg['isUser'])
-        message_text = latest_message['text'].lower()
-
         # Get support category from context if available
         support_category = context.get('support_category', '').lower()
 
-        # Generate follow-up options based on context and conversation
+        # Categories whose suggestions depend only on the context are answered
+        # before the message text is lowercased or scanned
         if support_category == 'transactions':
             if not context.get('transaction_details'):
-                return ["View recent transactions", "Search for specific transaction", "Download transaction history"]
+                return TRANSACTIONS_START_FOLLOW_UPS
             elif context.get('dispute_needed'):
-                return ["File a dispute", "Check dispute status", "Upload supporting documents"]
+                return TRANSACTIONS_DISPUTE_FOLLOW_UPS
             else:
-                return ["Export to Excel", "Set up transaction alerts", "Ask another question"]
-
-        elif support_category == 'account':
-            if 'activate' in message_text:
-                return ["Activate by phone", "Activate through mobile app", "Activate online"]
-            elif 'limit' in message_text:
-                return ["Check current limit", "Request limit increase", "Set spending alerts"]
-            elif 'lost' in message_text or 'stolen' in message_text:
-                return ["Block card immediately", "Order replacement card", "Review recent transactions"]
-            else:
-                return ["Update account info", "Add authorized users", "Manage card settings"]
+                return TRANSACTIONS_DETAIL_FOLLOW_UPS
 
         elif support_category == 'rewards':
             if not context.get('rewards_balance_checked'):
-                return ["Check rewards balance", "View redemption options", "See earning rates"]
+                return REWARDS_START_FOLLOW_UPS
             else:
-                return ["Redeem for travel", "Redeem for cash back", "Transfer to partners"]
+                return REWARDS_REDEEM_FOLLOW_UPS
 
         elif support_category == 'analytics':
-            return ["View spending by category", "Generate expense report", "Download year-to-date summary", "Track budget vs. actual"]
+            return ANALYTICS_FOLLOW_UPS
+
+        message_text = latest_user_message.lower()
+
+        if support_category == 'account':
+            if 'activate' in message_text:
+                return ACCOUNT_ACTIVATE_FOLLOW_UPS
+            elif 'limit' in message_text:
+                return ACCOUNT_LIMIT_FOLLOW_UPS
+            elif any(word in message_text for word in LOST_CARD_KEYWORDS):
+                return ACCOUNT_LOST_CARD_FOLLOW_UPS
+            else:
+                return ACCOUNT_GENERAL_FOLLOW_UPS
 
         elif support_category == 'technical':
             if 'login' in message_text:
-                return ["Reset password", "Unlock account", "Set up two-factor authentication"]
+                return TECHNICAL_LOGIN_FOLLOW_UPS
             elif 'app' in message_text:
-                return ["Update mobile app", "Clear app cache", "Reinstall app"]
+                return TECHNICAL_APP_FOLLOW_UPS
             else:
-                return ["Contact technical support", "View system status", "Access user guide"]
+                return TECHNICAL_GENERAL_FOLLOW_UPS
 
         # Keyword-based suggestions when category not yet determined
-        if any(word in message_text for word in ['transaction', 'charge', 'purchase', 'payment']):
-            return ["View my transactions", "Dispute a charge", "Download statement"]
-        elif any(word in message_text for word in ['activate', 'new card', 'replacement']):
-            return ["Activate my card", "Check card status", "Order replacement"]
-        elif any(word in message_text for word in ['limit', 'credit', 'increase']):
-            return ["Check my credit limit", "Request limit increase", "View available credit"]
-        elif any(word in message_text for word in ['rewards', 'points', 'redeem']):
-            return ["Check rewards balance", "Redeem rewards", "Learn about rewards program"]
-        elif any(word in message_text for word in ['report', 'expense', 'statement']):
-            return ["Generate expense report", "Download statement", "View spending summary"]
-        elif any(word in message_text for word in ['dispute', 'fraud', 'unauthorized']):
-            return ["Report fraudulent transaction", "File a dispute", "Block my card"]
-        elif any(word in message_text for word in ['fee', 'charge', 'interest']):
-            return ["View fee schedule", "Understand my charges", "Ask about interest rates"]
-        elif any(word in message_text for word in ['travel', 'international', 'foreign']):
-            return ["Set travel notification", "Check foreign transaction fees", "View travel benefits"]
-
-        return ["View account summary", "Check recent transactions", "Ask another question"]
+        matched = {m.lastgroup for m in FOLLOW_UP_KEYWORD_RE.finditer(message_text)}
+        if matched:
+            for group_name, follow_ups in KEYWORD_FOLLOW_UPS.items():
+                if group_name in matched:
+                    return follow_ups
+
+        return DEFAULT_FOLLOW_UPS
     except Exception as e:
-        logger.error(f"Error in generate_follow_up_options: {str(e)}")
-        return []
+        logger.error("Error in generate_follow_up_options: %s", e)
+        return ()
+
+# Shape of the card summary returned to the frontend, with every field empty.
+# The lookup tables below are shared by every request, so they are exposed as
+# read-only views; generate_card_summary copies before filling one in.
+EMPTY_CARD_SUMMARY = MappingProxyType({
+    "current_balance": 0,
+    "available_credit": 0,
+    "credit_limit": 0,
+    "rewards_points": 0,
+    "statement_date": "",
+    "payment_due_date": "",
+    "card_type": ""
+})
+
+# Placeholder card figures per support category, used until generate_card_summary
+# is wired to a real account API
+CARD_SUMMARY_PLACEHOLDERS = MappingProxyType({
+    "account": MappingProxyType({
+        "current_balance": 2500.00,
+        "available_credit": 7500.00,
+        "credit_limit": 10000.00,
+        "card_type": "BMO Corporate Card",
+    }),
+    "rewards": MappingProxyType({
+        "rewards_points": 15000,
+        "card_type": "BMO Corporate Rewards Card",
+        "current_balance": 3200.00,
+        "available_credit": 16800.00,
+        "credit_limit": 20000.00,
+    }),
+    "transactions": MappingProxyType({
+        "current_balance": 1800.00,
+        "available_credit": 13200.00,
+        "credit_limit": 15000.00,
+        "statement_date": "2024-01-31",
+        "payment_due_date": "2024-02-15",
+    }),
+})
+DEFAULT_CARD_SUMMARY_PLACEHOLDER = MappingProxyType({
+    "current_balance": 2000.00,
+    "available_credit": 8000.00,
+    "credit_limit": 10000.00,
+    "card_type": "BMO Corporate Card",
+})
 
 def should_show_card_summary(context: Dict) -> bool:
     """Determine if we have enough context to show a card account summary."""
@@ -500,7 +701,7 @@ def should_show_card_summary(context: Dict) -> bool:
         # Show summary if user has requested account info or we have card details
         return bool(context.get('show_summary')) or bool(context.get('card_number_last4'))
     except Exception as e:
-        logger.error(f"Error in should_show_card_summary: {str(e)}")
+        logger.error("Error in should_show_card_summary: %s", e)
         return False
 
 def generate_card_summary(context: Dict) -> Dict:
@@ -509,50 +710,12 @@ def generate_card_summary(context: Dict) -> Dict:
         support_category = context.get('support_category', '')
 
         # Basic card summary - this should be expanded with actual API calls to get real data
-        summary = {
-            "current_balance": 0,
-            "available_credit": 0,
-            "credit_limit": 0,
-            "rewards_points": 0,
-            "statement_date": "",
-            "payment_due_date": "",
-            "card_type": ""
-        }
+        summary = dict(EMPTY_CARD_SUMMARY)
 
         # Placeholder data based on support category
-        if support_category == "account":
-            summary['current_balance'] = 2500.00
-            summary['available_credit'] = 7500.00
-            summary['credit_limit'] = 10000.00
-            summary['card_type'] = "BMO Corporate Card"
-        elif support_category == "rewards":
-            summary['rewards_points'] = 15000
-            summary['card_type'] = "BMO Corporate Rewards Card"
-            summary['current_balance'] = 3200.00
-            summary['available_credit'] = 16800.00
-            summary['credit_limit'] = 20000.00
-        elif support_category == "transactions":
-            summary['current_balance'] = 1800.00
-            summary['available_credit'] = 13200.00
-            summary['credit_limit'] = 15000.00
-            summary['statement_date'] = "2024-01-31"
-            summary['payment_due_date'] = "2024-02-15"
-        else:
-            # Default summary
-            summary['current_balance'] = 2000.00
-            summary['available_credit'] = 8000.00
-            summary['credit_limit'] = 10000.00
-            summary['card_type'] = "BMO Corporate Card"
+        summary.update(CARD_SUMMARY_PLACEHOLDERS.get(support_category, DEFAULT_CARD_SUMMARY_PLACEHOLDER))
 
         return summary
     except Exception as e:
-        logger.error(f"Error in generate_card_summary: {str(e)}")
-        return {
-            "current_balance": 0,
-            "available_credit": 0,
-            "credit_limit": 0,
-            "rewards_points": 0,
-            "statement_date": "",
-            "payment_due_date": "",
-            "card_type": ""
-        }
+        logger.error("Error in generate_card_summary: %s", e)
+        return dict(EMPTY_CARD_SUMMARY)
@@ -1,6 +1,8 @@
 import os
 import logging
 import tempfile
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 import boto3
 from botocore.exceptions import ClientError
@@ -19,20 +21,36 @@ from langchain_community.document_loaders import (
 )
 import hashlib
 import json
+import urllib.parse
 from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Wrapper placed around retrieved chunks before they are added to the LLM prompt
+RAG_CONTEXT_TEMPLATE = """Based on the following relevant information from corporate card policy documents:
+
+{context}
+
+Sources consulted:
+{source_list}"""
+
+# Checkpoint the indexed documents file every N re-embedded documents so an
+# interrupted run does not have to re-embed everything it already finished
+INDEXED_DOCS_SAVE_INTERVAL = 25
+
 class RAGManager:
-    def __init__(self, s3_bucket_name: str = "teamone-kb", collection_name: str = "corporate_card_docs", base_url: str = "http://10.105.212.69:3009"):
+    def __init__(self, s3_bucket_name: str = "teamone-kb", collection_name: str = "corporate_card_docs", base_url: str = "http://10.105.212.69:3009", search_cache_size: int = 256):
         """
         Initialize the RAG Manager with S3 bucket and ChromaDB configuration
+
+        search_cache_size bounds the number of cached search results; 0 disables the cache.
         """
         self.s3_bucket_name = s3_bucket_name
         self.collection_name = collection_name
         self.base_url = base_url
+        self.documents_url = f"{base_url}/documents/"
         
         # Initialize S3 client
         self.s3_client = boto3.client("s3", region_name="ca-central-1")
@@ -55,13 +73,13 @@ class RAGManager:
         # Get or create collection
         try:
             self.collection = self.chroma_client.get_collection(name=self.collection_name)
-            logger.info(f"Using existing collection: {self.collection_name}")
+            logger.info("Using existing collection: %s", self.collection_name)
         except:
             self.collection = self.chroma_client.create_collection(
                 name=self.collection_name,
                 metadata={"description": "Corporate card documents from S3"}
             )
-            logger.info(f"Created new collection: {self.collection_name}")
+            logger.info("Created new collection: %s", self.collection_name)
         
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -74,6 +92,15 @@ class RAGManager:
         # Track indexed documents
         self.indexed_docs_file = "./indexed_documents.json"
         self.indexed_docs = self._load_indexed_docs()
+        
+        # Cache of search results keyed by normalized query, so repeated
+        # questions skip the query embedding and vector search
+        self.search_cache_size = search_cache_size
+        self._search_cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+        # Bumped on every invalidation so a search that read the collection
+        # before a change cannot store its now-stale results afterwards
+        self._search_cache_generation = 0
     
     def _load_indexed_docs(self) -> Dict[str, Any]:
         """Load the list of already indexed documents"""
@@ -87,13 +114,33 @@ class RAGManager:
     
     def _save_indexed_docs(self):
         """Save the list of indexed documents"""
+        # Dump a snapshot so a concurrent indexing run can't change the dict mid-write
+        indexed_docs = dict(self.indexed_docs)
         with open(self.indexed_docs_file, 'w') as f:
-            json.dump(self.indexed_docs, f, indent=2)
+            json.dump(indexed_docs, f, indent=2)
+    
+    def _checkpoint_indexed_docs(self):
+        """Save the list of indexed documents, logging rather than raising on failure"""
+        try:
+            self._save_indexed_docs()
+        except Exception as e:
+            logger.error("Error saving indexed documents file: %s", e)
     
     def _get_file_hash(self, content: bytes) -> str:
         """Generate a hash for file content"""
         return hashlib.md5(content).hexdigest()
     
+    def _search_cache_key(self, query: str, k: int) -> tuple:
+        """Normalize a query for search caching. The embedding model is uncased
+        and ignores whitespace runs, so neither affects the results."""
+        return (" ".join(query.lower().split()), k)
+    
+    def _clear_search_cache(self):
+        """Drop cached search results after the collection changes"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+            self._search_cache_generation += 1
+    
     def _get_loader_for_file(self, file_path: str):
         """Get the appropriate document loader based on file extension"""
         ext = os.path.splitext(file_path)[1].lower()
@@ -114,23 +161,37 @@ class RAGManager:
             # Try text loader as fallback
             return TextLoader(file_path)
     
-    def download_and_index_file(self, s3_key: str) -> bool:
-        """Download a file from S3 and index it in ChromaDB"""
+    def download_and_index_file(self, s3_key: str, save: bool = True, object_info: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Download a file from S3 and index it in ChromaDB
+
+        Args:
+            s3_key: Key of the object to index
+            save: Persist the indexed documents file after indexing. Bulk
+                callers pass False and save once at the end.
+            object_info: The object's entry from list_objects_v2, if the
+                caller has it. Its Size and LastModified are used instead
+                of issuing a HEAD request.
+        """
         try:
             # Check if file is already indexed
-            response = self.s3_client.head_object(Bucket=self.s3_bucket_name, Key=s3_key)
-            file_size = response['ContentLength']
-            last_modified = response['LastModified'].isoformat()
+            if object_info is not None:
+                file_size = object_info['Size']
+                last_modified = object_info['LastModified'].isoformat()
+            else:
+                response = self.s3_client.head_object(Bucket=self.s3_bucket_name, Key=s3_key)
+                file_size = response['ContentLength']
+                last_modified = response['LastModified'].isoformat()
             
             # Check if we've already indexed this exact version
             if s3_key in self.indexed_docs:
                 if (self.indexed_docs[s3_key].get('size') == file_size and 
                     self.indexed_docs[s3_key].get('last_modified') == last_modified):
-                    logger.info(f"File {s3_key} already indexed and unchanged")
+                    logger.info("File %s already indexed and unchanged", s3_key)
                     return True
             
             # Download file from S3
-            logger.info(f"Downloading {s3_key} from S3...")
+            logger.info("Downloading %s from S3...", s3_key)
             response = self.s3_client.get_object(Bucket=self.s3_bucket_name, Key=s3_key)
             file_content = response['Body'].read()
             
@@ -147,7 +208,9 @@ class RAGManager:
                 # Split documents into chunks
                 texts = self.text_splitter.split_documents(documents)
                 
-                # Prepare documents for ChromaDB
+                # Prepare documents for ChromaDB. All chunks of a document share
+                # one indexing timestamp, so format it once rather than per chunk
+                indexed_at = datetime.now().isoformat()
                 doc_texts = [doc.page_content for doc in texts]
                 doc_metadatas = [
                     {
@@ -155,7 +218,7 @@ class RAGManager:
                         "source": s3_key,
                         "chunk_index": i,
                         "total_chunks": len(texts),
-                        "indexed_at": datetime.now().isoformat()
+                        "indexed_at": indexed_at
                     } 
                     for i, doc in enumerate(texts)
                 ]
@@ -166,35 +229,40 @@ class RAGManager:
                 # Generate unique IDs for each chunk
                 ids = [f"{s3_key}_chunk_{i}" for i in range(len(texts))]
                 
-                # First, delete any existing chunks for this document
                 try:
-                    existing_ids = self.collection.get(
-                        where={"source": s3_key}
-                    )['ids']
-                    if existing_ids:
-                        self.collection.delete(ids=existing_ids)
-                        logger.info(f"Deleted {len(existing_ids)} existing chunks for {s3_key}")
-                except:
-                    pass
-                
-                # Add to ChromaDB
-                self.collection.add(
-                    embeddings=embeddings,
-                    documents=doc_texts,
-                    metadatas=doc_metadatas,
-                    ids=ids
-                )
+                    # First, delete any existing chunks for this document
+                    try:
+                        existing_ids = self.collection.get(
+                            where={"source": s3_key}
+                        )['ids']
+                        if existing_ids:
+                            self.collection.delete(ids=existing_ids)
+                            logger.info("Deleted %d existing chunks for %s", len(existing_ids), s3_key)
+                    except:
+                        pass
+                    
+                    # Add to ChromaDB
+                    self.collection.add(
+                        embeddings=embeddings,
+                        documents=doc_texts,
+                        metadatas=doc_metadatas,
+                        ids=ids
+                    )
+                finally:
+                    # Invalidate even if add fails, since the old chunks are gone
+                    self._clear_search_cache()
                 
                 # Update indexed docs tracking
                 self.indexed_docs[s3_key] = {
                     "size": file_size,
                     "last_modified": last_modified,
                     "chunks": len(texts),
-                    "indexed_at": datetime.now().isoformat()
+                    "indexed_at": indexed_at
                 }
-                self._save_indexed_docs()
+                if save:
+                    self._save_indexed_docs()
                 
-                logger.info(f"Successfully indexed {s3_key} with {len(texts)} chunks")
+                logger.info("Successfully indexed %s with %d chunks", s3_key, len(texts))
                 return True
                 
             finally:
@@ -202,15 +270,16 @@ class RAGManager:
                 os.unlink(tmp_file_path)
                 
         except ClientError as e:
-            logger.error(f"Error downloading {s3_key} from S3: {e}")
+            logger.error("Error downloading %s from S3: %s", s3_key, e)
             return False
         except Exception as e:
-            logger.error(f"Error indexing {s3_key}: {e}")
+            logger.error("Error indexing %s: %s", s3_key, e)
             return False
     
     def index_all_documents(self) -> Dict[str, int]:
         """Index all documents in the S3 bucket"""
         stats = {"success": 0, "failed": 0, "skipped": 0}
+        unsaved = 0
         
         try:
             # List all objects in the bucket
@@ -228,22 +297,34 @@ class RAGManager:
                     # Check if file type is supported
                     ext = os.path.splitext(s3_key)[1].lower()
                     if ext not in ['.pdf', '.docx', '.doc', '.txt', '.md', '.pptx', '.ppt', '.xlsx', '.xls', '.csv']:
-                        logger.info(f"Skipping unsupported file type: {s3_key}")
+                        logger.info("Skipping unsupported file type: %s", s3_key)
                         stats["skipped"] += 1
                         continue
                     
-                    # Index the file
-                    if self.download_and_index_file(s3_key):
+                    # Index the file. Unchanged files succeed without touching
+                    # their tracking entry, so only re-embedded ones count as unsaved.
+                    previous_entry = self.indexed_docs.get(s3_key)
+                    if self.download_and_index_file(s3_key, save=False, object_info=obj):
                         stats["success"] += 1
+                        if self.indexed_docs.get(s3_key) is not previous_entry:
+                            unsaved += 1
+                            if unsaved >= INDEXED_DOCS_SAVE_INTERVAL:
+                                self._checkpoint_indexed_docs()
+                                unsaved = 0
                     else:
                         stats["failed"] += 1
             
-            logger.info(f"Indexing complete. Success: {stats['success']}, Failed: {stats['failed']}, Skipped: {stats['skipped']}")
+            logger.info("Indexing complete. Success: %d, Failed: %d, Skipped: %d",
+                        stats['success'], stats['failed'], stats['skipped'])
             return stats
             
         except ClientError as e:
-            logger.error(f"Error listing objects in S3 bucket: {e}")
+            logger.error("Error listing objects in S3 bucket: %s", e)
             return stats
+        finally:
+            # Persist whatever was indexed, however the run ended
+            if unsaved:
+                self._checkpoint_indexed_docs()
     
     def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -256,6 +337,15 @@ class RAGManager:
         Returns:
             List of relevant documents with metadata
         """
+        cache_key = self._search_cache_key(query, k)
+        if self.search_cache_size > 0:
+            with self._search_cache_lock:
+                generation = self._search_cache_generation
+                cached_results = self._search_cache.get(cache_key)
+                if cached_results is not None:
+                    self._search_cache.move_to_end(cache_key)
+                    return list(cached_results)
+        
         try:
             # Generate embedding for the query
             query_embedding = self.embeddings.embed_query(query)
@@ -277,10 +367,18 @@ class RAGManager:
                     "source": results['metadatas'][0][i].get('source', 'Unknown')
                 })
             
-            return formatted_results
+            if self.search_cache_size > 0:
+                with self._search_cache_lock:
+                    if generation == self._search_cache_generation:
+                        self._search_cache[cache_key] = formatted_results
+                        self._search_cache.move_to_end(cache_key)
+                        while len(self._search_cache) > self.search_cache_size:
+                            self._search_cache.popitem(last=False)
+            
+            return list(formatted_results)
             
         except Exception as e:
-            logger.error(f"Error searching documents: {e}")
+            logger.error("Error searching documents: %s", e)
             return []
     
     def get_context_for_prompt(self, query: str, k: int = 5) -> str:
@@ -299,43 +397,41 @@ class RAGManager:
         if not results:
             return ""
         
-        # Format the context
+        # Format the context. Sources are deduplicated with a dict rather than
+        # a set so they keep retrieval order: set order of strings varies
+        # between processes, which made otherwise identical prompts differ
         context_parts = []
-        sources = set()
+        sources = {}
         
         for result in results:
             source = result['source']
             metadata = result['metadata']
             page_num = metadata.get('page', 'Unknown')
             # Create URL-encoded document link
-            import urllib.parse
-            encoded_source = urllib.parse.quote(source)
-            doc_link = f"{self.base_url}/documents/{encoded_source}"
+            doc_link = self.documents_url + urllib.parse.quote(source)
             
-            sources.add(f"{source} (Page {page_num}) - [View Document]({doc_link})")
+            sources[f"- {source} (Page {page_num}) - [View Document]({doc_link})"] = None
             content = result['content'].strip()
             context_parts.append(f"[From {source}, Page {page_num} - Link: {doc_link}]:\n{content}")
         
         context = "\n\n---\n\n".join(context_parts)
         
-        # Add source attribution with page numbers and links
-        source_list = "\n".join([f"- {source}" for source in sources])
+        # Add source attribution with page numbers and links. Entries are
+        # collected as ready-made bullet lines, so a single join suffices
+        source_list = "\n".join(sources)
         
-        return f"""Based on the following relevant information from corporate card policy documents:
-
-{context}
-
-Sources consulted:
-{source_list}"""
+        return RAG_CONTEXT_TEMPLATE.format(context=context, source_list=source_list)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the indexed documents"""
         try:
-            # Get total documents in collection
-            total_chunks = len(self.collection.get()['ids'])
+            # Fetch chunk metadata once; ids are always returned, and the chunk
+            # text isn't needed for stats
+            collection_data = self.collection.get(include=["metadatas"])
+            total_chunks = len(collection_data['ids'])
             
             # Get unique sources
-            all_metadata = self.collection.get()['metadatas']
+            all_metadata = collection_data['metadatas']
             unique_sources = set(meta.get('source', '') for meta in all_metadata if meta)
             
             return {
@@ -346,7 +442,7 @@ Sources consulted:
                 "indexed_documents": self.indexed_docs
             }
         except Exception as e:
-            logger.error(f"Error getting stats: {e}")
+            logger.error("Error getting stats: %s", e)
             return {
                 "total_documents": 0,
                 "total_chunks": 0,
@@ -358,12 +454,16 @@ Sources consulted:
     def clear_index(self):
         """Clear the entire index"""
         try:
-            # Delete and recreate the collection
-            self.chroma_client.delete_collection(name=self.collection_name)
-            self.collection = self.chroma_client.create_collection(
-                name=self.collection_name,
-                metadata={"description": "Corporate card documents from S3"}
-            )
+            try:
+                # Delete and recreate the collection
+                self.chroma_client.delete_collection(name=self.collection_name)
+                self.collection = self.chroma_client.create_collection(
+                    name=self.collection_name,
+                    metadata={"description": "Corporate card documents from S3"}
+                )
+            finally:
+                # Invalidate even if create fails, since the old chunks are gone
+                self._clear_search_cache()
             
             # Clear indexed docs tracking
             self.indexed_docs = {}
@@ -372,5 +472,5 @@ Sources consulted:
             logger.info("Index cleared successfully")
             return True
         except Exception as e:
-            logger.error(f"Error clearing index: {e}")
+            logger.error("Error clearing index: %s", e)
             return False
\ No newline at end of file